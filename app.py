@@ -3,12 +3,19 @@ Flask web application for image similarity comparison.
 Provides endpoints for uploading images and computing similarity.
 """
 
+# Sets thread-count environment variables; must precede numpy/tensorflow
+import cpu_threads  # noqa: F401
+
 import os
+import re
+import tempfile
+import time
 import logging
+import threading
 from datetime import datetime
-from werkzeug.utils import secure_filename
 from flask import Flask, render_template, request, jsonify, send_from_directory
-from similarity_engine import get_similarity_engine
+from feature_store import FeatureStore
+from similarity_engine import content_digest, get_similarity_engine
 
 # Configure logging
 logging.basicConfig(
@@ -17,15 +24,102 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# File extensions accepted for upload (lowercase, with leading dot)
+ALLOWED_EXTENSIONS = frozenset({'.png', '.jpg', '.jpeg'})
+
+# Content digests as produced by similarity_engine.content_digest
+DIGEST_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
 # Initialize Flask app
 app = Flask(__name__)
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 app.config['UPLOAD_FOLDER'] = 'uploads'
-app.config['ALLOWED_EXTENSIONS'] = {'png', 'jpg', 'jpeg'}
+app.config['MODEL_NAME'] = os.environ.get('MODEL_NAME', 'resnet50')
+# TensorFlow Serving REST endpoint; when set, workers do not load the model
+app.config['MODEL_SERVER_URL'] = os.environ.get('MODEL_SERVER_URL')
+app.config['FEATURE_STORE_PATH'] = os.environ.get(
+    'FEATURE_STORE_PATH', 'features.sqlite3'
+)
+# Stored features and persisted uploads unused for this long are swept
+app.config['CACHE_TTL_SECONDS'] = int(
+    os.environ.get('CACHE_TTL_SECONDS', 7 * 24 * 3600)
+)
+# Batch sizes compiled at startup (comma-separated, e.g. "1,2"); each one
+# adds XLA compile time to every worker's boot. Unset compiles all of them.
+warm_up_sizes = os.environ.get('WARMUP_BATCH_SIZES')
+app.config['WARMUP_BATCH_SIZES'] = None if warm_up_sizes is None else [
+    int(size) for size in warm_up_sizes.split(',') if size.strip()
+]
+app.config['CLEANUP_INTERVAL_SECONDS'] = int(
+    os.environ.get('CLEANUP_INTERVAL_SECONDS', 3600)
+)
 
 # Ensure upload directory exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+feature_store = FeatureStore(app.config['FEATURE_STORE_PATH'])
+
+
+def preload_similarity_engine():
+    """Load the similarity model at startup instead of on the first request."""
+    start = time.perf_counter()
+    get_similarity_engine(
+        app.config['MODEL_NAME'],
+        model_server_url=app.config['MODEL_SERVER_URL'],
+        feature_store=feature_store,
+        warm_up_batch_sizes=app.config['WARMUP_BATCH_SIZES']
+    )
+    logger.info(
+        f"Similarity engine ({app.config['MODEL_NAME']}) loaded in "
+        f"{time.perf_counter() - start:.2f}s"
+    )
+
+
+def cleanup_expired_uploads(max_age):
+    """
+    Delete persisted uploads older than max_age seconds.
+
+    Args:
+        max_age (float): Maximum file age in seconds
+
+    Returns:
+        int: Number of files removed
+    """
+    cutoff = time.time() - max_age
+    removed = 0
+    with os.scandir(app.config['UPLOAD_FOLDER']) as entries:
+        for entry in entries:
+            if entry.name.startswith('.') or not entry.is_file():
+                continue
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except OSError as e:
+                logger.warning(f"Error removing {entry.path}: {str(e)}")
+    if removed:
+        logger.info(f"Removed {removed} expired uploads")
+    return removed
+
+
+def start_cleanup_worker():
+    """Start a background thread that sweeps expired features and uploads."""
+    def sweep():
+        while True:
+            time.sleep(app.config['CLEANUP_INTERVAL_SECONDS'])
+            try:
+                max_age = app.config['CACHE_TTL_SECONDS']
+                feature_store.purge_older_than(max_age)
+                cleanup_expired_uploads(max_age)
+            except Exception as e:
+                logger.error(f"Error during cleanup: {str(e)}")
+
+    threading.Thread(target=sweep, name='cache-cleanup', daemon=True).start()
+
+
+preload_similarity_engine()
+start_cleanup_worker()
+
 
 def allowed_file(filename):
     """
@@ -37,37 +131,78 @@ def allowed_file(filename):
     Returns:
         bool: True if file extension is allowed
     """
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
+    return os.path.splitext(filename)[1].lower() in ALLOWED_EXTENSIONS
 
 
-def save_uploaded_file(file):
+def save_uploaded_file(file, data, digest):
     """
-    Save uploaded file with a secure filename.
+    Save uploaded file under its content digest.
+
+    Files are content-addressed, so uploading the same image again reuses
+    the existing file instead of writing a new copy. New files are written
+    to a temporary file and renamed into place, so a failed or concurrent
+    write never leaves a partial file under the digest name.
 
     Args:
         file: FileStorage object from request
+        data (bytes): Contents of the upload, already read into memory
+        digest (str): Content digest of data
 
     Returns:
         str: Path to saved file or None if error
     """
     if file and allowed_file(file.filename):
-        # Generate unique filename with timestamp
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        original_filename = secure_filename(file.filename)
-        filename = f"{timestamp}_{original_filename}"
+        # The extension was validated by allowed_file; secure_filename would
+        # drop it along with non-ASCII stems such as "фото.jpg"
+        extension = os.path.splitext(file.filename)[1].lower()
+        filename = f"{digest}{extension}"
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
 
+        if os.path.exists(filepath):
+            logger.info(f"File already stored: {filepath}")
+            try:
+                # Refresh the mtime so the cleanup worker keeps the file
+                # whose URL is about to be returned
+                os.utime(filepath)
+                return filepath
+            except FileNotFoundError:
+                # Swept between the check and the touch; write it again
+                pass
+
+        tmp_path = None
         try:
-            file.save(filepath)
+            # Dot-prefixed so the cleanup worker skips it while it is written
+            fd, tmp_path = tempfile.mkstemp(
+                prefix='.upload-', dir=app.config['UPLOAD_FOLDER']
+            )
+            with os.fdopen(fd, 'wb') as out:
+                out.write(data)
+            os.replace(tmp_path, filepath)
+            tmp_path = None
             logger.info(f"File saved: {filepath}")
             return filepath
         except Exception as e:
             logger.error(f"Error saving file: {str(e)}")
             return None
+        finally:
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
     return None
 
 
+def persist_requested():
+    """
+    Check whether the client asked for uploads to be kept on disk.
+
+    Returns:
+        bool: True if the 'persist' form or query value is truthy
+    """
+    return request.values.get('persist', '').lower() in ('1', 'true', 'yes')
+
+
 @app.route('/')
 def index():
     """Render the main application page."""
@@ -77,57 +212,82 @@ def index():
 @app.route('/compare', methods=['POST'])
 def compare_images():
     """
-    Compare two uploaded images and return similarity score.
+    Compare two images and return similarity score.
+
+    Each image is either uploaded as a file (image1, image2) or referenced
+    by the content hash returned from an earlier comparison (image1_hash,
+    image2_hash), which skips the upload and feature extraction entirely.
+
+    Uploads are decoded in memory. They are only written to disk, and
+    image URLs returned, when the request sets persist=true.
 
     Returns:
         JSON response with similarity score and metadata
     """
     try:
-        # Validate request
-        if 'image1' not in request.files or 'image2' not in request.files:
-            return jsonify({
-                'status': 'error',
-                'message': 'Both images are required'
-            }), 400
-
-        image1 = request.files['image1']
-        image2 = request.files['image2']
-
-        # Validate filenames
-        if image1.filename == '' or image2.filename == '':
-            return jsonify({
-                'status': 'error',
-                'message': 'No selected files'
-            }), 400
-
-        # Validate file types
-        if not (allowed_file(image1.filename) and allowed_file(image2.filename)):
-            return jsonify({
-                'status': 'error',
-                'message': 'Only PNG, JPG, and JPEG files are allowed'
-            }), 400
-
-        # Save uploaded files
-        image1_path = save_uploaded_file(image1)
-        image2_path = save_uploaded_file(image2)
-
-        if not image1_path or not image2_path:
-            return jsonify({
-                'status': 'error',
-                'message': 'Error saving uploaded files'
-            }), 500
+        engine = get_similarity_engine(app.config['MODEL_NAME'])
+
+        # Resolve each image to (upload, bytes, digest)
+        images = {}
+        for field in ('image1', 'image2'):
+            upload = request.files.get(field)
+            digest = request.values.get(f'{field}_hash', '').strip().lower()
+
+            if upload is not None and upload.filename != '':
+                if not allowed_file(upload.filename):
+                    return jsonify({
+                        'status': 'error',
+                        'message': 'Only PNG, JPG, and JPEG files are allowed'
+                    }), 400
+                # Read uploads into memory; the engine decodes them directly
+                data = upload.read()
+                images[field] = (upload, data, content_digest(data))
+            elif digest:
+                if not DIGEST_PATTERN.match(digest):
+                    return jsonify({
+                        'status': 'error',
+                        'message': f'Malformed {field}_hash'
+                    }), 400
+                if not engine.has_features(digest):
+                    return jsonify({
+                        'status': 'error',
+                        'message': f'Unknown {field}_hash; upload the image instead'
+                    }), 404
+                images[field] = (None, None, digest)
+            elif upload is not None:
+                return jsonify({
+                    'status': 'error',
+                    'message': 'No selected files'
+                }), 400
+            else:
+                return jsonify({
+                    'status': 'error',
+                    'message': 'Both images are required'
+                }), 400
+
+        extras = {f'{field}_hash': digest
+                  for field, (_, _, digest) in images.items()}
+        if persist_requested():
+            for field, (upload, data, digest) in images.items():
+                if upload is None:
+                    continue
+                image_path = save_uploaded_file(upload, data, digest)
+                if not image_path:
+                    return jsonify({
+                        'status': 'error',
+                        'message': 'Error saving uploaded files'
+                    }), 500
+                extras[f'{field}_url'] = f'/uploads/{os.path.basename(image_path)}'
 
         # Compute similarity
-        engine = get_similarity_engine()
-        result = engine.compute_similarity(image1_path, image2_path)
-
-        # Add image URLs to response
-        result['image1_url'] = f'/uploads/{os.path.basename(image1_path)}'
-        result['image2_url'] = f'/uploads/{os.path.basename(image2_path)}'
+        _, image1_data, image1_digest = images['image1']
+        _, image2_data, image2_digest = images['image2']
+        result = engine.compute_similarity(
+            image1_data, image2_data, image1_digest, image2_digest
+        )
 
-        # Clean up old files (optional - keep for now for debugging)
-        # os.remove(image1_path)
-        # os.remove(image2_path)
+        # Add image hashes and URLs to response
+        result.update(extras)
 
         logger.info(f"Comparison completed: {result['similarity_score']}%")
         return jsonify(result)
@@ -194,4 +354,7 @@ def internal_error(error):
 if __name__ == '__main__':
     logger.info("Starting Image Similarity Comparison Server...")
     port = int(os.environ.get('PORT', 5000))
+    # Keep debug off: the debug reloader starts a second process that loads
+    # its own model copy and fights the first for the pinned CPU threads.
+    # Use gunicorn (gunicorn.conf.py) in production.
     app.run(debug=False, host='0.0.0.0', port=port)
@@ -0,0 +1,36 @@
+"""
+CPU thread pool configuration for NumPy, OpenMP and TensorFlow.
+Import this module before anything that imports numpy or tensorflow: the
+libraries read these variables once, when their thread pools start.
+"""
+
+import os
+
+# By default both TF pools use every logical CPU, which oversubscribes
+# hyperthreads and makes latency erratic. Intra-op threads are pinned to the
+# physical cores, shared between the web workers on this host when each of
+# them runs its own model (i.e. no MODEL_SERVER_URL). Inter-op is 1 for
+# single-request latency (set 2 for throughput under concurrency).
+# setdefault lets deployments override any of these from the environment.
+if hasattr(os, 'sched_getaffinity'):
+    # Honours cgroup cpusets and taskset, unlike os.cpu_count()
+    _LOGICAL_CPUS = len(os.sched_getaffinity(0))
+else:
+    _LOGICAL_CPUS = os.cpu_count() or 2
+_PHYSICAL_CORES = max(1, _LOGICAL_CPUS // 2)
+_MODEL_WORKERS = 1 if os.environ.get('MODEL_SERVER_URL') else max(
+    1, int(os.environ.get('WEB_CONCURRENCY', 1))
+)
+_THREADS_PER_WORKER = max(1, _PHYSICAL_CORES // _MODEL_WORKERS)
+
+os.environ.setdefault('TF_NUM_INTRAOP_THREADS', str(_THREADS_PER_WORKER))
+os.environ.setdefault('TF_NUM_INTEROP_THREADS', '1')
+os.environ.setdefault('OMP_NUM_THREADS', str(_THREADS_PER_WORKER))
+if _MODEL_WORKERS == 1:
+    # Compact affinity binds thread N of every process to the same CPU, so
+    # it is only safe when a single process on this host runs the model
+    os.environ.setdefault('KMP_AFFINITY', 'granularity=fine,compact,1,0')
+os.environ.setdefault('TF_ENABLE_ONEDNN_OPTS', '1')
+
+INTRA_OP_THREADS = int(os.environ['TF_NUM_INTRAOP_THREADS'])
+INTER_OP_THREADS = int(os.environ['TF_NUM_INTEROP_THREADS'])
@@ -0,0 +1,83 @@
+"""
+Export the feature extraction model for faster inference.
+Writes either an int8-quantized TFLite model that the similarity engine picks
+up automatically on startup, or a SavedModel for TensorFlow Serving.
+"""
+
+import argparse
+import glob
+import os
+import logging
+
+from similarity_engine import BACKBONES, ImageSimilarityEngine
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def find_sample_images(sample_dir, limit):
+    """
+    Collect representative images used for quantization calibration.
+
+    Args:
+        sample_dir (str): Directory containing sample images
+        limit (int): Maximum number of images to return
+
+    Returns:
+        list: Paths to sample images
+    """
+    paths = []
+    for pattern in ('*.png', '*.jpg', '*.jpeg'):
+        paths.extend(glob.glob(os.path.join(sample_dir, pattern)))
+    return sorted(paths)[:limit]
+
+
+def main():
+    """Parse command line arguments and run the export."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--model', default='resnet50', choices=sorted(BACKBONES),
+                        help='Backbone to export')
+    parser.add_argument('--format', default='tflite',
+                        choices=['tflite', 'savedmodel'],
+                        help='Export format')
+    parser.add_argument('--samples',
+                        help='Directory of representative images (required '
+                             'for tflite; uploads are not kept by default)')
+    parser.add_argument('--limit', type=int, default=100,
+                        help='Number of calibration images to use')
+    parser.add_argument('--output', default=None,
+                        help='Output path (defaults to the engine TFLite path, '
+                             'or models/serving/<model>/1 for SavedModel)')
+    args = parser.parse_args()
+
+    if args.format == 'savedmodel':
+        engine = ImageSimilarityEngine(
+            args.model, use_tflite=False, coalesce_requests=False,
+            use_saved_model=False
+        )
+        output_path = args.output or os.path.join(
+            'models', 'serving', args.model, '1'
+        )
+        engine.export_saved_model(output_path)
+        return
+
+    if not args.samples:
+        parser.error("--samples is required for --format tflite")
+    sample_paths = find_sample_images(args.samples, args.limit)
+    if not sample_paths:
+        parser.error(f"No sample images found in {args.samples}")
+
+    engine = ImageSimilarityEngine(
+        args.model, use_tflite=False, coalesce_requests=False,
+        use_saved_model=False
+    )
+    output_path = args.output or engine.tflite_path
+    logger.info(f"Calibrating with {len(sample_paths)} images")
+    engine.export_tflite(output_path, sample_paths)
+
+
+if __name__ == '__main__':
+    main()
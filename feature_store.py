@@ -0,0 +1,192 @@
+"""
+Persistent feature vector store backed by SQLite.
+Maps image content digests to extracted feature vectors so images seen in
+earlier runs, or by other worker processes, skip inference entirely.
+"""
+
+import sqlite3
+import threading
+import time
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class FeatureStore:
+    """
+    Disk-backed cache of feature vectors keyed by model variant and content
+    digest.
+    Safe to share between threads; several processes may open the same file.
+
+    Entries expire by last use rather than by age. Uses are recorded in
+    memory and written in one batch at most every touch_flush_interval
+    seconds, so lookups do not turn into writes.
+    """
+
+    def __init__(self, db_path='features.sqlite3', touch_flush_interval=60):
+        """
+        Open (or create) the feature store.
+
+        Args:
+            db_path (str): Path to the SQLite database file
+            touch_flush_interval (float): Seconds between writes of recorded
+                uses to the last_used column
+        """
+        self.db_path = db_path
+        self.touch_flush_interval = touch_flush_interval
+        self._lock = threading.Lock()
+        self._touched = {}
+        self._last_flush = time.monotonic()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock, self._conn:
+            # WAL lets readers in other processes proceed during writes;
+            # NORMAL syncs at checkpoints rather than on every commit, which
+            # can only lose recent entries (recomputable) on power loss
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS features ('
+                ' model TEXT NOT NULL,'
+                ' digest TEXT NOT NULL,'
+                ' dtype TEXT NOT NULL,'
+                ' vector BLOB NOT NULL,'
+                ' created_at REAL NOT NULL,'
+                ' last_used REAL NOT NULL DEFAULT 0,'
+                ' PRIMARY KEY (model, digest))'
+            )
+            self._add_last_used_column()
+            self._conn.execute('DROP INDEX IF EXISTS features_created_at')
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS features_last_used'
+                ' ON features (last_used)'
+            )
+
+    def _add_last_used_column(self):
+        """Add last_used to stores created before entries expired by use."""
+        columns = {
+            row[1]
+            for row in self._conn.execute('PRAGMA table_info(features)')
+        }
+        if 'last_used' in columns:
+            return
+        try:
+            self._conn.execute(
+                'ALTER TABLE features'
+                ' ADD COLUMN last_used REAL NOT NULL DEFAULT 0'
+            )
+        except sqlite3.OperationalError as e:
+            # Another worker migrated the same file first
+            if 'duplicate column' not in str(e):
+                raise
+        self._conn.execute(
+            'UPDATE features SET last_used = created_at WHERE last_used = 0'
+        )
+
+    def get(self, model_name, digest):
+        """
+        Look up a stored feature vector.
+
+        Args:
+            model_name (str): Model variant the features were extracted with,
+                e.g. 'resnet50/fp32'
+            digest (str): Content digest of the image
+
+        Returns:
+            np.array: Read-only feature vector, or None if not stored
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT dtype, vector FROM features'
+                ' WHERE model = ? AND digest = ?',
+                (model_name, digest)
+            ).fetchone()
+        if row is None:
+            return None
+        self.touch(model_name, digest)
+        dtype, vector = row
+        return np.frombuffer(vector, dtype=np.dtype(dtype))
+
+    def touch(self, model_name, digest):
+        """
+        Record a use of a stored entry, postponing its expiry.
+
+        The use is kept in memory and written with the next batch; this
+        call only writes when touch_flush_interval has elapsed.
+
+        Args:
+            model_name (str): Model variant the features were extracted with
+            digest (str): Content digest of the image
+        """
+        with self._lock:
+            self._touched[(model_name, digest)] = time.time()
+            due = (time.monotonic() - self._last_flush
+                   >= self.touch_flush_interval)
+        if due:
+            self.flush_touches()
+
+    def flush_touches(self):
+        """Write recorded uses to the last_used column in one transaction."""
+        with self._lock, self._conn:
+            touched, self._touched = self._touched, {}
+            self._last_flush = time.monotonic()
+            self._conn.executemany(
+                'UPDATE features SET last_used = MAX(last_used, ?)'
+                ' WHERE model = ? AND digest = ?',
+                [(used, model_name, digest)
+                 for (model_name, digest), used in touched.items()]
+            )
+
+    def put(self, model_name, digest, features):
+        """
+        Store a feature vector, replacing any existing entry.
+
+        Args:
+            model_name (str): Model variant the features were extracted with,
+                e.g. 'resnet50/fp32'
+            digest (str): Content digest of the image
+            features (np.array): Flat feature vector
+        """
+        self.put_many(model_name, [(digest, features)])
+
+    def put_many(self, model_name, items):
+        """
+        Store several feature vectors in a single transaction.
+
+        Args:
+            model_name (str): Model variant the features were extracted with,
+                e.g. 'resnet50/fp32'
+            items (list): (digest, features) pairs
+        """
+        now = time.time()
+        rows = [(model_name, digest, features.dtype.name,
+                 features.tobytes(), now, now)
+                for digest, features in items]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO features'
+                ' (model, digest, dtype, vector, created_at, last_used)'
+                ' VALUES (?, ?, ?, ?, ?, ?)',
+                rows
+            )
+
+    def purge_older_than(self, max_age):
+        """
+        Delete entries not used for more than max_age seconds.
+
+        Args:
+            max_age (float): Maximum time since last use, in seconds
+
+        Returns:
+            int: Number of entries removed
+        """
+        self.flush_touches()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                'DELETE FROM features WHERE last_used < ?',
+                (time.time() - max_age,)
+            )
+        if cursor.rowcount:
+            logger.info(f"Purged {cursor.rowcount} expired feature vectors")
+        return cursor.rowcount
@@ -0,0 +1,27 @@
+"""
+Gunicorn configuration for production deployments.
+Run with: gunicorn -c gunicorn.conf.py app:app
+"""
+
+import os
+import sys
+
+# cpu_threads splits the physical cores between workers using
+# WEB_CONCURRENCY, so set the worker count before importing it. Workers are
+# forked from this process and inherit the resulting environment.
+os.environ.setdefault('WEB_CONCURRENCY', '4')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import cpu_threads  # noqa: F401,E402
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+# Each worker holds its own engine. Point MODEL_SERVER_URL at TensorFlow
+# Serving so workers stay light and the model is loaded only once.
+workers = int(os.environ['WEB_CONCURRENCY'])
+threads = int(os.environ.get('GUNICORN_THREADS', 2))
+
+# Model loading and remote inference can be slow on cold start. Workers load
+# the model after forking and are killed if that exceeds this timeout; each
+# batch size warmed up adds an XLA compile, so lower WARMUP_BATCH_SIZES
+# (e.g. "1,2") if workers time out while booting.
+timeout = 120
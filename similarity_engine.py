@@ -1,115 +1,1003 @@
 """
 Image Similarity Engine using Deep Learning.
-Utilizes pre-trained ResNet50 for feature extraction and cosine similarity for comparison.
+Utilizes a pre-trained CNN (ResNet50 or MobileNetV2) for feature extraction
+and cosine similarity for comparison.
 """
 
+import base64
+import hashlib
+import io
+import json
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import Future
+
+# Sets thread-count environment variables; must precede numpy/tensorflow
+from cpu_threads import INTER_OP_THREADS, INTRA_OP_THREADS
+
+import cv2
 import numpy as np
 from PIL import Image
-from tensorflow.keras.applications.resnet50 import ResNet50, preprocess_input
-from tensorflow.keras.preprocessing import image
-from sklearn.metrics.pairwise import cosine_similarity
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# TensorFlow is imported inside the methods that need it, so web workers
+# that send inference to a model server never load it.
+
+# Feature vectors are cached and stored at half precision: unit-length
+# vectors lose well under 0.1% cosine accuracy, and each one takes half the
+# memory. Arithmetic upcasts to float32, since NumPy has no FP16 BLAS.
+FEATURE_DTYPE = np.float16
+
+# Input format of the cached SavedModel; part of its path, so a cache with a
+# different signature is never loaded. Bump when the 'serve' signature changes.
+SAVED_MODEL_FORMAT = 'uint8_v1'
+
+# Local forward passes are padded to one of these batch sizes, so XLA and
+# TFLite only ever see a handful of shapes, all prepared at startup.
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32)
+
+# Supported backbones. Preprocessing mirrors each model's Keras
+# preprocess_input: pixels in channel_order, minus mean, times scale. The
+# channel order is applied while decoding; mean and scale run in the graph.
+BACKBONES = {
+    'resnet50': {
+        'model_class': 'ResNet50',
+        'input_size': (224, 224),
+        'channel_order': 'BGR',
+        'mean': (103.939, 116.779, 123.68),
+        'scale': 1.0,
+    },
+    'mobilenet_v2': {
+        'model_class': 'MobileNetV2',
+        'input_size': (224, 224),
+        'channel_order': 'RGB',
+        'mean': (127.5, 127.5, 127.5),
+        'scale': 1.0 / 127.5,
+    },
+}
+
+
+def _configure_tf_threading():
+    """Apply the pinned thread counts to the TensorFlow runtime."""
+    import tensorflow as tf
+
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(INTRA_OP_THREADS)
+        tf.config.threading.set_inter_op_parallelism_threads(INTER_OP_THREADS)
+    except RuntimeError:
+        # The runtime is already initialized (e.g. a second engine); the
+        # thread counts set at that point stay in effect.
+        pass
+
+
+def new_content_hash():
+    """
+    Create a hash object used to content-address uploaded images.
+
+    Returns:
+        hashlib.blake2b: Incremental hasher; feed it bytes with update()
+    """
+    return hashlib.blake2b(digest_size=16)
+
+
+def content_digest(data):
+    """
+    Compute the content digest of an in-memory image.
+
+    Args:
+        data (bytes): Encoded image bytes
+
+    Returns:
+        str: Hex digest of the bytes
+    """
+    hasher = new_content_hash()
+    hasher.update(data)
+    return hasher.hexdigest()
+
+
+def file_digest(img_path, chunk_size=1 << 16):
+    """
+    Compute the content digest of a file on disk.
+
+    Args:
+        img_path (str): Path to the file
+        chunk_size (int): Number of bytes to read per chunk
+
+    Returns:
+        str: Hex digest of the file contents
+    """
+    hasher = new_content_hash()
+    with open(img_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _read_image_source(img):
+    """
+    Normalize an image source to a file path or encoded bytes.
+
+    Args:
+        img: Path to an image file, encoded image bytes, or a binary
+            file-like object (e.g. an upload stream)
+
+    Returns:
+        str or bytes: The path unchanged, or the encoded image bytes
+    """
+    if isinstance(img, (str, os.PathLike)):
+        return os.fspath(img)
+    if isinstance(img, (bytes, bytearray, memoryview)):
+        return bytes(img)
+    return img.read()
+
+
+def _describe_source(img):
+    """Return a short human-readable label for an image source in logs."""
+    if img is None:
+        return "<stored features>"
+    if isinstance(img, str):
+        return img
+    return f"<{len(img)} bytes>"
+
+
+class InferenceBatcher:
+    """
+    Coalesce forward passes from concurrent requests into shared batches.
+
+    Callers submit individual preprocessed images and block on a Future.
+    A background worker collects up to max_batch images, waiting at most
+    max_wait seconds after the first one arrives, runs them through a
+    single forward pass and scatters the outputs back to the callers.
+    """
+
+    def __init__(self, predict_fn, max_batch=32, max_wait=0.005):
+        """
+        Start the background batching worker.
+
+        Args:
+            predict_fn (callable): Runs a forward pass over an (N, H, W, 3)
+                array and returns an (N, D) array
+            max_batch (int): Maximum number of images per forward pass
+            max_wait (float): Seconds to wait for more images to join a batch
+        """
+        self.predict_fn = predict_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(
+            target=self._run, name='inference-batcher', daemon=True
+        )
+        self._worker.start()
+
+    def submit(self, img_array):
+        """
+        Queue a single preprocessed image for inference.
+
+        Args:
+            img_array (np.array): uint8 image of shape (H, W, 3)
+
+        Returns:
+            Future: Resolves to the model output for this image
+        """
+        future = Future()
+        self._queue.put((img_array, future))
+        return future
+
+    def _collect_batch(self):
+        """Block for one item, then gather more until full or timed out."""
+        items = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(items) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    items.append(self._queue.get(timeout=remaining))
+                else:
+                    items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _run(self):
+        """Worker loop: run each collected batch and resolve its futures."""
+        while True:
+            items = self._collect_batch()
+            futures = [future for _, future in items]
+            try:
+                outputs = self.predict_fn(np.stack([arr for arr, _ in items]))
+            except Exception as e:
+                logger.error(f"Error running batched inference: {str(e)}")
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            for future, output in zip(futures, outputs):
+                future.set_result(output)
+
 
 class ImageSimilarityEngine:
     """
     Compute similarity between two images using deep learning.
-    Uses ResNet50 for feature extraction and cosine similarity for comparison.
+    Uses a pre-trained backbone from BACKBONES (ResNet50 by default) for
+    feature extraction and cosine similarity for comparison.
     """
 
-    def __init__(self, model_name='resnet50'):
+    def __init__(self, model_name='resnet50', feature_cache_size=512,
+                 tflite_path=None, use_tflite=True, mixed_precision=False,
+                 coalesce_requests=True, max_batch=32, max_batch_wait=0.005,
+                 inference_timeout=60, model_server_url=None,
+                 saved_model_path=None, use_saved_model=True,
+                 feature_store=None, warm_up_batch_sizes=None):
         """
         Initialize the similarity engine with a pre-trained model.
 
         Args:
-            model_name (str): Name of the pre-trained model to use
+            model_name (str): Name of the pre-trained model to use, one of
+                BACKBONES ('resnet50' or 'mobilenet_v2')
+            feature_cache_size (int): Maximum number of feature vectors kept
+                in the content-addressed LRU cache (0 disables caching)
+            tflite_path (str): Path to a quantized TFLite export of the
+                model; used instead of Keras when the file exists. Defaults
+                to models/<model_name>_int8.tflite
+            use_tflite (bool): Whether to use the TFLite export if present
+            mixed_precision (bool): Build the Keras model with the
+                mixed_float16 policy so convolutions run in FP16 on
+                hardware that supports it
+            coalesce_requests (bool): Share forward passes between
+                concurrent requests through an InferenceBatcher
+            max_batch (int): Maximum images per forward pass; batches are
+                padded to the BATCH_BUCKETS sizes below it (and max_batch)
+            max_batch_wait (float): Seconds to wait for concurrent requests
+                to join a coalesced batch
+            inference_timeout (float): Seconds to wait for a coalesced
+                forward pass before giving up
+            model_server_url (str): Base URL of a TensorFlow Serving REST
+                endpoint (e.g. http://localhost:8501). When set, inference
+                runs on the server and no model is loaded in this process
+            saved_model_path (str): Where the Keras model is cached as a
+                SavedModel so later startups skip building it. Defaults to
+                models/<model_name>[_fp16]_savedmodel_<SAVED_MODEL_FORMAT>
+            use_saved_model (bool): Whether to load and write that cache
+            feature_store (FeatureStore): Persistent store consulted on
+                in-memory cache misses and updated with new features
+            warm_up_batch_sizes (list): Batch sizes to compile at startup,
+                rounded up to their buckets; None compiles every bucket.
+                Other buckets compile on first use
         """
+        if model_name not in BACKBONES:
+            raise ValueError(
+                f"Unknown model '{model_name}', expected one of "
+                f"{', '.join(sorted(BACKBONES))}"
+            )
         self.model_name = model_name
         self.model = None
-        self.img_size = (224, 224)
+        self.tflite_path = tflite_path or os.path.join(
+            'models', f'{model_name}_int8.tflite'
+        )
+        self.use_tflite = use_tflite
+        self.model_server_url = model_server_url
+        precision_suffix = '_fp16' if mixed_precision else ''
+        self.saved_model_path = saved_model_path or os.path.join(
+            'models',
+            f'{model_name}{precision_suffix}_savedmodel_{SAVED_MODEL_FORMAT}'
+        )
+        self.use_saved_model = use_saved_model
+        self._saved_model = None
+        self._infer = None
+        self._interpreters = {}
+        self._interpreter_lock = threading.Lock()
+        self._batch_buckets = tuple(
+            size for size in BATCH_BUCKETS if size < max_batch
+        ) + (max_batch,)
+        if warm_up_batch_sizes is None:
+            self._warm_up_buckets = self._batch_buckets
+        else:
+            self._warm_up_buckets = tuple(sorted({
+                self._bucket_for(size) for size in warm_up_batch_sizes
+            }))
+        self.mixed_precision = mixed_precision
+        backbone = BACKBONES[model_name]
+        self._model_class = backbone['model_class']
+        self.img_size = backbone['input_size']
+        self._channel_order = backbone['channel_order']
+        self._mean = np.array(backbone['mean'], dtype=np.float32)
+        self._scale = np.float32(backbone['scale'])
+        self.feature_cache_size = feature_cache_size
+        self._feature_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.feature_store = feature_store
+        self.inference_timeout = inference_timeout
         self._load_model()
+        # int8, fp16 and fp32 models give slightly different vectors, so
+        # stored features are kept apart per inference variant
+        self.feature_key = f'{model_name}/{self._inference_variant()}'
+        self._batcher = None
+        if coalesce_requests:
+            self._batcher = InferenceBatcher(
+                self._run_model, max_batch=max_batch, max_wait=max_batch_wait
+            )
 
     def _load_model(self):
-        """Load the pre-trained ResNet50 model without top classification layer."""
+        """
+        Load the pre-trained backbone without top classification layer.
+
+        Nothing is loaded when a model server is configured. Otherwise a
+        quantized TFLite export at self.tflite_path takes precedence, then
+        the cached SavedModel, and finally the Keras model is built (and
+        cached as a SavedModel for the next startup). A cache that fails to
+        load or warm up is discarded and rebuilt from Keras.
+        """
         try:
+            if self.model_server_url:
+                logger.info(
+                    f"Using {self.model_name} served at {self.model_server_url}"
+                )
+                return
+
+            import tensorflow as tf
+
+            _configure_tf_threading()
+
+            if self.use_tflite and os.path.exists(self.tflite_path):
+                logger.info(f"Loading TFLite model from {self.tflite_path}...")
+                try:
+                    self._load_tflite_interpreters()
+                    logger.info("TFLite model loaded successfully")
+                    return
+                except Exception as e:
+                    logger.warning(
+                        f"Unusable TFLite model, re-export it with "
+                        f"export_model.py; falling back: {str(e)}"
+                    )
+                    self._interpreters = {}
+
+            if self.use_saved_model and os.path.isdir(self.saved_model_path):
+                logger.info(
+                    f"Loading SavedModel from {self.saved_model_path}..."
+                )
+                try:
+                    self._saved_model = tf.saved_model.load(
+                        self.saved_model_path
+                    )
+                    self._compile_inference(self._saved_model.serve)
+                    logger.info("SavedModel loaded successfully")
+                    return
+                except Exception as e:
+                    logger.warning(
+                        f"Unusable SavedModel cache, rebuilding: {str(e)}"
+                    )
+                    self._saved_model = None
+                    self._infer = None
+                    self._discard_saved_model_cache()
+
             logger.info(f"Loading {self.model_name} model...")
-            self.model = ResNet50(
-                weights='imagenet',
-                include_top=False,
-                pooling='avg',
-                input_shape=(224, 224, 3)
-            )
+            if self.mixed_precision:
+                tf.keras.mixed_precision.set_global_policy('mixed_float16')
+            try:
+                model_fn = getattr(tf.keras.applications, self._model_class)
+                self.model = model_fn(
+                    weights='imagenet',
+                    include_top=False,
+                    pooling='avg',
+                    input_shape=(*self.img_size, 3)
+                )
+            finally:
+                # Layers keep the policy they were built with; restore the
+                # default so other models are unaffected
+                if self.mixed_precision:
+                    tf.keras.mixed_precision.set_global_policy('float32')
+
+            if self.use_saved_model:
+                self._write_saved_model_cache()
+            self._compile_inference(self._preprocess_and_forward)
             logger.info("Model loaded successfully")
         except Exception as e:
             logger.error(f"Error loading model: {str(e)}")
             raise
 
-    def _load_and_preprocess_image(self, img_path):
+    def _inference_variant(self):
+        """Name the loaded inference path: serving, tflite_int8, fp16 or fp32."""
+        if self.model_server_url:
+            return 'serving'
+        if self._interpreters:
+            return 'tflite_int8'
+        return 'fp16' if self.mixed_precision else 'fp32'
+
+    def _write_saved_model_cache(self):
+        """
+        Cache the Keras model as a SavedModel, atomically.
+
+        The export is written to a temporary directory next to the cache and
+        renamed into place, so a crash never leaves a partial cache and
+        concurrent workers cannot interleave their writes; the first rename
+        wins and the others are discarded.
+        """
+        parent = os.path.dirname(self.saved_model_path) or '.'
+        tmp_dir = None
+        try:
+            os.makedirs(parent, exist_ok=True)
+            tmp_dir = tempfile.mkdtemp(prefix='.savedmodel-', dir=parent)
+            export_dir = os.path.join(tmp_dir, 'model')
+            self.export_saved_model(export_dir)
+            try:
+                os.replace(export_dir, self.saved_model_path)
+            except OSError:
+                # Another worker already put a complete cache in place
+                logger.info("SavedModel cache written by another process")
+        except Exception as e:
+            logger.warning(f"Could not cache SavedModel: {str(e)}")
+        finally:
+            if tmp_dir is not None:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _discard_saved_model_cache(self):
+        """Move an unusable SavedModel cache aside and delete it."""
+        parent = os.path.dirname(self.saved_model_path) or '.'
+        trash_dir = tempfile.mkdtemp(prefix='.savedmodel-stale-', dir=parent)
+        try:
+            os.replace(self.saved_model_path, os.path.join(trash_dir, 'model'))
+        except OSError:
+            # Already discarded (or replaced) by another worker
+            pass
+        finally:
+            shutil.rmtree(trash_dir, ignore_errors=True)
+
+    def _load_tflite_interpreters(self):
+        """
+        Create one interpreter per batch bucket, allocated and warmed up.
+
+        Resizing an interpreter reallocates all of its tensors, so each
+        bucket keeps its own instead of resizing one on every request.
+        Raises ValueError for exports that do not take uint8 pixels, such
+        as ones written before preprocessing moved into the model.
+        """
+        import tensorflow as tf
+
+        for batch_size in self._batch_buckets:
+            interpreter = tf.lite.Interpreter(
+                model_path=self.tflite_path,
+                num_threads=INTRA_OP_THREADS
+            )
+            input_detail = interpreter.get_input_details()[0]
+            input_dtype = np.dtype(input_detail['dtype'])
+            if input_dtype != np.uint8:
+                raise ValueError(
+                    f"{self.tflite_path} takes {input_dtype.name} input, "
+                    "expected uint8"
+                )
+            input_index = input_detail['index']
+            interpreter.resize_tensor_input(
+                input_index, [batch_size, *self.img_size, 3]
+            )
+            interpreter.allocate_tensors()
+            interpreter.set_tensor(
+                input_index,
+                np.zeros((batch_size, *self.img_size, 3), dtype=np.uint8)
+            )
+            interpreter.invoke()
+            self._interpreters[batch_size] = interpreter
+
+    def _input_spec(self):
+        """Return the spec of a model input batch: (N, H, W, 3) uint8."""
+        import tensorflow as tf
+
+        return tf.TensorSpec([None, *self.img_size, 3], tf.uint8)
+
+    def _preprocess_and_forward(self, batch):
+        """
+        Normalize a uint8 batch in the graph and run the Keras model.
+
+        Casting and mean subtraction happen inside TensorFlow, so only one
+        byte per pixel crosses the numpy/TensorFlow boundary.
+
+        Args:
+            batch (tf.Tensor): uint8 images of shape (N, H, W, 3) in the
+                backbone's channel order
+
+        Returns:
+            tf.Tensor: Model outputs of shape (N, D)
+        """
+        import tensorflow as tf
+
+        x = tf.cast(batch, tf.float32) - self._mean
+        if self._scale != 1.0:
+            x = x * self._scale
+        return self.model(x, training=False)
+
+    def _compile_inference(self, forward_fn):
+        """
+        Trace the forward pass into a graph function compiled with XLA.
+
+        The function is warmed up here so tracing and compilation happen at
+        startup rather than on the first request. Falls back to a plain
+        graph function if XLA is unavailable.
+
+        Args:
+            forward_fn (callable): Maps an (N, H, W, 3) uint8 tensor to
+                model outputs
+        """
+        import tensorflow as tf
+
+        signature = [self._input_spec()]
+        try:
+            self._infer = tf.function(
+                forward_fn, jit_compile=True, input_signature=signature
+            )
+            self._warm_up_inference()
+        except Exception as e:
+            logger.warning(f"XLA compilation failed, running without it: {str(e)}")
+            self._infer = tf.function(forward_fn, input_signature=signature)
+            self._warm_up_inference()
+
+    def _warm_up_inference(self):
+        """Run dummy batches through the compiled forward pass."""
+        import tensorflow as tf
+
+        # XLA compiles per concrete batch size, so each bucket warmed here
+        # adds to startup time; the rest compile on their first request
+        start = time.perf_counter()
+        for batch_size in self._warm_up_buckets:
+            self._infer(tf.zeros([batch_size, *self.img_size, 3], tf.uint8))
+        logger.info(
+            f"Warmed up batch sizes {list(self._warm_up_buckets)} in "
+            f"{time.perf_counter() - start:.2f}s"
+        )
+
+    def _bucket_for(self, size):
+        """Return the smallest bucket that fits size images."""
+        return next(
+            (bucket for bucket in self._batch_buckets if bucket >= size),
+            self._batch_buckets[-1]
+        )
+
+    def _predict(self, batch):
+        """
+        Run a forward pass, sharing it with concurrent requests if enabled.
+
+        Args:
+            batch (np.array): uint8 images of shape (N, 224, 224, 3)
+
+        Returns:
+            np.array: Model outputs of shape (N, D)
+        """
+        if self._batcher is None:
+            return self._run_model(batch)
+        futures = [self._batcher.submit(img_array) for img_array in batch]
+        return np.stack([
+            future.result(timeout=self.inference_timeout) for future in futures
+        ])
+
+    def _run_model(self, batch):
+        """
+        Run a forward pass over a preprocessed batch.
+
+        Local batches are split at the largest bucket and zero-padded up to
+        the next bucket size; outputs for the padding are dropped.
+
+        Args:
+            batch (np.array): uint8 images of shape (N, 224, 224, 3)
+
+        Returns:
+            np.array: Model outputs of shape (N, D)
+        """
+        if self.model_server_url:
+            return self._run_remote_model(batch)
+
+        outputs = []
+        largest = self._batch_buckets[-1]
+        for start in range(0, len(batch), largest):
+            chunk = batch[start:start + largest]
+            bucket = self._bucket_for(len(chunk))
+            padded = chunk
+            if bucket > len(chunk):
+                padding = np.zeros(
+                    (bucket - len(chunk), *chunk.shape[1:]), dtype=chunk.dtype
+                )
+                padded = np.concatenate([chunk, padding])
+            outputs.append(self._run_bucket(padded)[:len(chunk)])
+        return np.concatenate(outputs)
+
+    def _run_bucket(self, batch):
+        """
+        Run the local model on a batch whose size is one of the buckets.
+
+        Args:
+            batch (np.array): uint8 images of shape (bucket, 224, 224, 3)
+
+        Returns:
+            np.array: Model outputs of shape (bucket, D)
+        """
+        if not self._interpreters:
+            import tensorflow as tf
+
+            return self._infer(tf.constant(batch)).numpy()
+
+        interpreter = self._interpreters[len(batch)]
+        # Interpreters hold mutable tensor state and are not thread-safe
+        with self._interpreter_lock:
+            input_detail = interpreter.get_input_details()[0]
+            output_detail = interpreter.get_output_details()[0]
+            interpreter.set_tensor(input_detail['index'], batch)
+            interpreter.invoke()
+            return interpreter.get_tensor(output_detail['index']).copy()
+
+    def _run_remote_model(self, batch):
+        """
+        Run a forward pass on a TensorFlow Serving instance.
+
+        Each image is sent as its raw uint8 pixels, base64-encoded, to the
+        serve_bytes signature written by export_saved_model. Encoding is
+        done in C, unlike serializing every pixel as a JSON number.
+
+        Args:
+            batch (np.array): uint8 images of shape (N, 224, 224, 3)
+
+        Returns:
+            np.array: Model outputs of shape (N, D)
+        """
+        url = (f"{self.model_server_url.rstrip('/')}"
+               f"/v1/models/{self.model_name}:predict")
+        instances = [
+            {'b64': base64.b64encode(img_array.tobytes()).decode('ascii')}
+            for img_array in np.ascontiguousarray(batch, dtype=np.uint8)
+        ]
+        body = json.dumps({
+            'signature_name': 'serve_bytes',
+            'instances': instances
+        }).encode('utf-8')
+        req = urllib.request.Request(
+            url, data=body, headers={'Content-Type': 'application/json'}
+        )
+        with urllib.request.urlopen(req, timeout=self.inference_timeout) as resp:
+            predictions = json.load(resp)['predictions']
+        return np.asarray(predictions, dtype=np.float32)
+
+    def export_saved_model(self, export_dir):
+        """
+        Export the model as a SavedModel for TensorFlow Serving.
+
+        The 'serve' signature takes uint8 images in the backbone's channel
+        order and includes the mean subtraction and scaling. The
+        'serve_bytes' signature takes the same pixels as raw bytes, one
+        string per image, which TensorFlow Serving's REST API accepts
+        base64-encoded.
+
+        Args:
+            export_dir (str): Versioned destination directory, e.g.
+                models/serving/resnet50/1
+
+        Returns:
+            str: Path to the written SavedModel
+        """
+        if self.model is None:
+            raise RuntimeError("SavedModel export requires the Keras model")
+        import tensorflow as tf
+
+        archive = tf.keras.export.ExportArchive()
+        archive.track(self.model)
+        archive.add_endpoint(
+            name='serve',
+            fn=self._preprocess_and_forward,
+            input_signature=[self._input_spec()]
+        )
+        archive.add_endpoint(
+            name='serve_bytes',
+            fn=self._forward_raw_bytes,
+            input_signature=[tf.TensorSpec([None], tf.string)]
+        )
+        archive.write_out(export_dir)
+        logger.info(f"SavedModel written to {export_dir}")
+        return export_dir
+
+    def _forward_raw_bytes(self, images):
+        """
+        Decode raw pixel bytes in the graph and run the model.
+
+        Args:
+            images (tf.Tensor): Strings of shape (N,), each holding the
+                H * W * 3 uint8 pixels of one image
+
+        Returns:
+            tf.Tensor: Model outputs of shape (N, D)
+        """
+        import tensorflow as tf
+
+        pixels = tf.io.decode_raw(images, tf.uint8)
+        pixels = tf.reshape(pixels, [-1, *self.img_size, 3])
+        return self._preprocess_and_forward(pixels)
+
+    def export_tflite(self, output_path, sample_paths):
+        """
+        Export the model as an int8-quantized TFLite model.
+
+        Like the SavedModel export, the TFLite model takes uint8 images and
+        includes the mean subtraction and scaling.
+
+        Args:
+            output_path (str): Destination of the .tflite file
+            sample_paths (list): Paths to representative images (around 100)
+                used to calibrate activation ranges
+
+        Returns:
+            str: Path to the written file
+        """
+        if self.model is None:
+            raise RuntimeError("TFLite export requires the Keras model")
+        import tensorflow as tf
+
+        def representative_dataset():
+            for img_path in sample_paths:
+                yield [self._load_and_preprocess_image(img_path)[np.newaxis]]
+
+        serve = tf.function(
+            self._preprocess_and_forward, input_signature=[self._input_spec()]
+        )
+        converter = tf.lite.TFLiteConverter.from_concrete_functions(
+            [serve.get_concrete_function()], self.model
+        )
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset
+        tflite_model = converter.convert()
+
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        with open(output_path, 'wb') as f:
+            f.write(tflite_model)
+        logger.info(f"TFLite model written to {output_path}")
+        return output_path
+
+    def _load_and_preprocess_image(self, img):
         """
         Load and preprocess an image for model input.
 
+        Images are decoded and downsampled with OpenCV (INTER_AREA); PIL is
+        only used as a fallback for files OpenCV cannot decode. In-memory
+        images are decoded straight from their bytes without touching disk.
+        Pixels stay uint8; normalization happens inside the model graph.
+
         Args:
-            img_path (str): Path to the image file
+            img (str or bytes): Path to the image file, or encoded image bytes
 
         Returns:
-            np.array: Preprocessed image array
+            np.array: uint8 image array of shape (224, 224, 3) in the
+                backbone's channel order
         """
         try:
-            img = Image.open(img_path).convert('RGB')
-            img = img.resize(self.img_size, Image.LANCZOS)
-            img_array = image.img_to_array(img)
-            img_array = np.expand_dims(img_array, axis=0)
-            img_array = preprocess_input(img_array)
-            return img_array
+            if isinstance(img, str):
+                decoded = cv2.imread(img, cv2.IMREAD_COLOR)
+            else:
+                decoded = cv2.imdecode(
+                    np.frombuffer(img, np.uint8), cv2.IMREAD_COLOR
+                )
+            if decoded is None:
+                return self._load_and_preprocess_image_pil(img)
+            decoded = cv2.resize(decoded, self.img_size,
+                                 interpolation=cv2.INTER_AREA)
+            # OpenCV decodes to BGR, which is what caffe-style models expect
+            if self._channel_order == 'RGB':
+                decoded = cv2.cvtColor(decoded, cv2.COLOR_BGR2RGB)
+            return decoded
         except Exception as e:
-            logger.error(f"Error preprocessing image {img_path}: {str(e)}")
+            logger.error(
+                f"Error preprocessing image {_describe_source(img)}: {str(e)}"
+            )
             raise
 
-    def _extract_features(self, img_path):
+    def _load_and_preprocess_image_pil(self, img):
+        """
+        Load and preprocess an image with PIL.
+
+        Args:
+            img (str or bytes): Path to the image file, or encoded image bytes
+
+        Returns:
+            np.array: uint8 image array of shape (224, 224, 3) in the
+                backbone's channel order
+        """
+        if not isinstance(img, str):
+            img = io.BytesIO(img)
+        pil_img = Image.open(img).convert('RGB')
+        pil_img = pil_img.resize(self.img_size, Image.LANCZOS)
+        # np.asarray reads the PIL buffer without copying
+        img_array = np.asarray(pil_img, dtype=np.uint8)
+        if self._channel_order == 'BGR':
+            img_array = img_array[..., ::-1]
+        return np.ascontiguousarray(img_array)
+
+    def _get_cached_features(self, digest):
+        """Return cached features for a content digest, or None on a miss."""
+        with self._cache_lock:
+            features = self._feature_cache.get(digest)
+            if features is not None:
+                self._feature_cache.move_to_end(digest)
+        if features is not None:
+            # Keep the stored copy from expiring while it is served from memory
+            if self.feature_store is not None:
+                try:
+                    self.feature_store.touch(self.feature_key, digest)
+                except Exception as e:
+                    logger.warning(f"Error updating feature store: {str(e)}")
+            return features
+
+        if self.feature_store is None:
+            return None
+        try:
+            features = self.feature_store.get(self.feature_key, digest)
+        except Exception as e:
+            logger.warning(f"Error reading feature store: {str(e)}")
+            return None
+        if features is not None:
+            self._cache_features(digest, features)
+        return features
+
+    def _store_features(self, items):
+        """
+        Persist features to the feature store, if one is configured.
+
+        Args:
+            items (list): (digest, features) pairs, written in one transaction
+        """
+        if self.feature_store is None:
+            return
+        try:
+            self.feature_store.put_many(self.feature_key, items)
+        except Exception as e:
+            logger.warning(f"Error writing feature store: {str(e)}")
+
+    def has_features(self, digest):
+        """
+        Check whether features for an image are already known.
+
+        Args:
+            digest (str): Content digest of the image
+
+        Returns:
+            bool: True if the image can be compared by digest alone
+        """
+        return self._get_cached_features(digest) is not None
+
+    def _cache_features(self, digest, features):
+        """Store features under a content digest, evicting the oldest entry."""
+        if self.feature_cache_size <= 0:
+            return
+        with self._cache_lock:
+            self._feature_cache[digest] = features
+            self._feature_cache.move_to_end(digest)
+            while len(self._feature_cache) > self.feature_cache_size:
+                self._feature_cache.popitem(last=False)
+
+    def _extract_features(self, img, digest=None):
         """
         Extract deep learning features from an image.
 
         Args:
-            img_path (str): Path to the image file
+            img: Path to the image file, encoded image bytes, or a binary
+                file-like object
+            digest (str): Content digest of the image, computed if omitted
 
         Returns:
-            np.array: Feature vector extracted from the image
+            np.array: Unit-length feature vector extracted from the image
+        """
+        return self._extract_features_batch([img], [digest])[0]
+
+    def _extract_features_batch(self, imgs, digests=None, batch_size=32):
+        """
+        Extract features for several images with batched forward passes.
+
+        Features are cached by content digest (in memory, then in the
+        feature store), so an image seen before skips preprocessing and
+        inference entirely. An image may be None when its digest is given
+        and its features are already cached. The remaining images are
+        stacked into (N, 224, 224, 3) tensors and run through the model
+        batch_size images at a time. Returned vectors are L2-normalized, so
+        cosine similarity between two of them is a plain dot product.
+
+        Args:
+            imgs (list): Image paths, encoded image bytes, binary file-like
+                objects, or None for images known only by digest
+            digests (list): Content digests matching imgs; entries that are
+                None are computed from the image contents
+            batch_size (int): Maximum number of images per forward pass
+
+        Returns:
+            list: Unit-length FEATURE_DTYPE feature vectors in the same
+                order as imgs
         """
         try:
-            preprocessed_img = self._load_and_preprocess_image(img_path)
-            features = self.model.predict(preprocessed_img, verbose=0)
-            return features.flatten()
+            imgs = [None if img is None else _read_image_source(img)
+                    for img in imgs]
+            if digests is None:
+                digests = [None] * len(imgs)
+            if any(img is None and d is None for img, d in zip(imgs, digests)):
+                raise ValueError("An image or its digest is required")
+            digests = [
+                d if d is not None
+                else file_digest(img) if isinstance(img, str)
+                else content_digest(img)
+                for img, d in zip(imgs, digests)
+            ]
+
+            features = {}
+            pending = {}
+            for img, digest in zip(imgs, digests):
+                if digest in features or digest in pending:
+                    continue
+                cached = self._get_cached_features(digest)
+                if cached is not None:
+                    features[digest] = cached
+                elif img is None:
+                    raise LookupError(f"No stored features for image {digest}")
+                else:
+                    pending[digest] = img
+
+            pending_items = list(pending.items())
+            for start in range(0, len(pending_items), batch_size):
+                chunk = pending_items[start:start + batch_size]
+                batch = np.stack([
+                    self._load_and_preprocess_image(img)
+                    for _, img in chunk
+                ])
+                outputs = self._predict(batch)
+                extracted = []
+                for (digest, _), output in zip(chunk, outputs):
+                    vector = np.ascontiguousarray(output.flatten(), dtype=np.float32)
+                    vector /= max(np.linalg.norm(vector), np.finfo(np.float32).tiny)
+                    vector = vector.astype(FEATURE_DTYPE)
+                    vector.flags.writeable = False
+                    self._cache_features(digest, vector)
+                    extracted.append((digest, vector))
+                    features[digest] = vector
+                self._store_features(extracted)
+
+            return [features[digest] for digest in digests]
         except Exception as e:
             logger.error(f"Error extracting features: {str(e)}")
             raise
 
-    def compute_similarity(self, img1_path, img2_path):
+    def compute_similarity(self, img1, img2,
+                           img1_digest=None, img2_digest=None):
         """
         Compute similarity between two images.
 
+        Images may be given as file paths, encoded bytes, or binary
+        file-like objects such as upload streams. An image may be None if
+        its digest is given and its features are already stored.
+
         Args:
-            img1_path (str): Path to first image
-            img2_path (str): Path to second image
+            img1: First image
+            img2: Second image
+            img1_digest (str): Content digest of the first image, if known
+            img2_digest (str): Content digest of the second image, if known
 
         Returns:
             dict: Dictionary containing similarity score and metadata
         """
         try:
-            logger.info(f"Computing similarity between {img1_path} and {img2_path}")
-
-            # Extract features from both images
-            features1 = self._extract_features(img1_path)
-            features2 = self._extract_features(img2_path)
+            img1 = None if img1 is None else _read_image_source(img1)
+            img2 = None if img2 is None else _read_image_source(img2)
+            logger.info(
+                f"Computing similarity between {_describe_source(img1)} "
+                f"and {_describe_source(img2)}"
+            )
 
-            # Reshape for cosine similarity
-            features1 = features1.reshape(1, -1)
-            features2 = features2.reshape(1, -1)
+            # Extract features from both images in a single forward pass
+            features1, features2 = self._extract_features_batch(
+                [img1, img2], [img1_digest, img2_digest]
+            )
 
-            # Compute cosine similarity
-            similarity = cosine_similarity(features1, features2)[0][0]
+            # Features are unit-length, so cosine similarity is a dot product
+            similarity = float(np.dot(
+                features1.astype(np.float32), features2.astype(np.float32)
+            ))
+            # Half-precision rounding can push identical images just past 1
+            similarity = min(max(similarity, -1.0), 1.0)
 
             # Convert to percentage
             similarity_percentage = float(similarity * 100)
@@ -144,45 +1032,96 @@ class ImageSimilarityEngine:
                 'similarity_score': 0
             }
 
-    def batch_compare(self, reference_img, comparison_imgs):
+    def batch_compare(self, reference_img, comparison_imgs, batch_size=32,
+                      top_k=None):
         """
         Compare a reference image against multiple images.
 
         Args:
             reference_img (str): Path to reference image
             comparison_imgs (list): List of paths to comparison images
+            batch_size (int): Maximum number of images per forward pass
+            top_k (int): Only return the top_k most similar images (images
+                that failed are still listed); None returns all of them.
+                Must be at least 1, otherwise ValueError is raised
 
         Returns:
-            list: List of similarity results
+            list: List of similarity results, most similar first
         """
-        results = []
-        ref_features = self._extract_features(reference_img)
+        if top_k is not None and top_k < 1:
+            raise ValueError(f"top_k must be None or at least 1, got {top_k}")
 
-        for comp_img in comparison_imgs:
-            try:
-                comp_features = self._extract_features(comp_img)
-                similarity = cosine_similarity(
-                    ref_features.reshape(1, -1),
-                    comp_features.reshape(1, -1)
-                )[0][0]
-
-                results.append({
-                    'image': comp_img,
-                    'similarity': float(similarity * 100)
-                })
-            except Exception as e:
-                logger.error(f"Error comparing {comp_img}: {str(e)}")
-                results.append({
-                    'image': comp_img,
-                    'similarity': 0,
-                    'error': str(e)
-                })
+        errors = []
+        try:
+            # Reference and comparison images share the same forward passes
+            ref_features, *all_features = self._extract_features_batch(
+                [reference_img, *comparison_imgs], batch_size=batch_size
+            )
+        except Exception:
+            # Fall back to one image at a time to report which ones failed;
+            # images from chunks that succeeded are already cached.
+            ref_features = self._extract_features(reference_img)
+            all_features = []
+            for comp_img in comparison_imgs:
+                try:
+                    all_features.append(self._extract_features(comp_img))
+                except Exception as e:
+                    logger.error(f"Error comparing {comp_img}: {str(e)}")
+                    all_features.append(None)
+                    errors.append({
+                        'image': comp_img,
+                        'similarity': 0,
+                        'error': str(e)
+                    })
+
+        extracted = [(img, f) for img, f in zip(comparison_imgs, all_features)
+                     if f is not None]
+        if not extracted:
+            return errors
+
+        # One BLAS call scores every comparison image against the reference
+        features_matrix = np.stack([f for _, f in extracted]).astype(np.float32)
+        scores = features_matrix @ ref_features.astype(np.float32)
+        np.clip(scores, -1.0, 1.0, out=scores)
+        if top_k is not None and top_k < len(scores):
+            # Partial selection is O(N); only the top_k candidates get sorted
+            candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+            order = candidates[np.argsort(-scores[candidates], kind='stable')]
+        else:
+            order = np.argsort(-scores, kind='stable')[:top_k]
 
-        return sorted(results, key=lambda x: x['similarity'], reverse=True)
+        # Convert all scores in one vectorized op instead of per result
+        percentages = (scores[order] * 100).tolist()
+        results = [{
+            'image': extracted[i][0],
+            'similarity': similarity
+        } for i, similarity in zip(order.tolist(), percentages)]
+        return results + errors
 
 
-def get_similarity_engine():
-    """Factory function to get or create a similarity engine instance."""
-    if not hasattr(get_similarity_engine, 'engine'):
-        get_similarity_engine.engine = ImageSimilarityEngine()
-    return get_similarity_engine.engine
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_similarity_engine(model_name='resnet50', **kwargs):
+    """
+    Factory function to get or create a similarity engine instance.
+
+    Thread-safe: concurrent first calls build the model only once.
+
+    Args:
+        model_name (str): Backbone to use, one of BACKBONES
+        **kwargs: Extra ImageSimilarityEngine options, used only when the
+            engine for model_name is first created
+
+    Returns:
+        ImageSimilarityEngine: Shared engine for the requested backbone
+    """
+    engine = _engines.get(model_name)
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get(model_name)
+            if engine is None:
+                engine = ImageSimilarityEngine(model_name, **kwargs)
+                _engines[model_name] = engine
+    return engine
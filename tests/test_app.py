@@ -0,0 +1,104 @@
+"""Tests for comparing images by content hash through /compare."""
+
+import importlib
+import os
+
+import numpy as np
+import pytest
+from werkzeug.datastructures import FileStorage
+
+KNOWN_DIGEST = '0123456789abcdef0123456789abcdef'
+
+
+@pytest.fixture(scope='module')
+def app_module(tmp_path_factory):
+    # A model server URL keeps TensorFlow out of the process; requests
+    # below only use stored features, so the server is never contacted
+    environ = {
+        'MODEL_SERVER_URL': 'http://model-server.invalid:8501',
+        'FEATURE_STORE_PATH': str(
+            tmp_path_factory.mktemp('store') / 'features.sqlite3'
+        ),
+    }
+    with pytest.MonkeyPatch.context() as mp:
+        for key, value in environ.items():
+            mp.setenv(key, value)
+        module = importlib.import_module('app')
+    engine = module.get_similarity_engine(module.app.config['MODEL_NAME'])
+    features = np.ones(2048, dtype=np.float16)
+    features /= np.linalg.norm(features.astype(np.float32))
+    module.feature_store.put(engine.feature_key, KNOWN_DIGEST, features)
+    return module
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+
+def test_compare_known_hashes(client):
+    response = client.post('/compare', data={
+        'image1_hash': KNOWN_DIGEST,
+        'image2_hash': KNOWN_DIGEST.upper(),
+    })
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['status'] == 'success'
+    assert body['image1_hash'] == body['image2_hash'] == KNOWN_DIGEST
+    assert body['similarity_score'] == pytest.approx(100, abs=0.1)
+
+
+def test_compare_unknown_hash_returns_404(client):
+    response = client.post('/compare', data={
+        'image1_hash': KNOWN_DIGEST,
+        'image2_hash': 'f' * 32,
+    })
+
+    assert response.status_code == 404
+    assert 'image2_hash' in response.get_json()['message']
+
+
+@pytest.mark.parametrize('digest', ['not-a-digest', 'a' * 31, 'g' * 32,
+                                    '../' + 'a' * 29])
+def test_compare_malformed_hash_returns_400(client, digest):
+    response = client.post('/compare', data={
+        'image1_hash': digest,
+        'image2_hash': KNOWN_DIGEST,
+    })
+
+    assert response.status_code == 400
+    assert 'image1_hash' in response.get_json()['message']
+
+
+def test_compare_missing_image_returns_400(client):
+    response = client.post('/compare', data={'image1_hash': KNOWN_DIGEST})
+
+    assert response.status_code == 400
+
+
+def test_save_uploaded_file_keeps_extension_of_non_ascii_name(
+        app_module, tmp_path, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, 'UPLOAD_FOLDER', str(tmp_path))
+    upload = FileStorage(filename='фото.JPG')
+
+    path = app_module.save_uploaded_file(upload, b'jpeg bytes', KNOWN_DIGEST)
+
+    assert path == os.path.join(str(tmp_path), f'{KNOWN_DIGEST}.jpg')
+    assert os.listdir(tmp_path) == [f'{KNOWN_DIGEST}.jpg']
+    with open(path, 'rb') as stored:
+        assert stored.read() == b'jpeg bytes'
+
+
+def test_save_uploaded_file_leaves_no_partial_file_on_error(
+        app_module, tmp_path, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, 'UPLOAD_FOLDER', str(tmp_path))
+
+    def fail_replace(src, dst):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(app_module.os, 'replace', fail_replace)
+    upload = FileStorage(filename='photo.png')
+
+    assert app_module.save_uploaded_file(upload, b'png', KNOWN_DIGEST) is None
+    assert os.listdir(tmp_path) == []
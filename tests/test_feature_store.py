@@ -0,0 +1,102 @@
+"""Tests for the SQLite-backed FeatureStore."""
+
+import sqlite3
+import time
+
+import numpy as np
+import pytest
+
+import feature_store as feature_store_module
+from feature_store import FeatureStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return FeatureStore(str(tmp_path / 'features.sqlite3'))
+
+
+def test_get_missing_returns_none(store):
+    assert store.get('resnet50/fp32', 'a' * 32) is None
+
+
+@pytest.mark.parametrize('dtype', [np.float16, np.float32])
+def test_put_get_round_trips_values_and_dtype(store, dtype):
+    features = np.linspace(-1, 1, 2048).astype(dtype)
+    store.put('resnet50/fp32', 'a' * 32, features)
+
+    stored = store.get('resnet50/fp32', 'a' * 32)
+    assert stored.dtype == dtype
+    np.testing.assert_array_equal(stored, features)
+
+
+def test_put_replaces_existing_entry(store):
+    store.put('resnet50/fp32', 'a' * 32, np.zeros(4, dtype=np.float16))
+    store.put('resnet50/fp32', 'a' * 32, np.ones(4, dtype=np.float16))
+
+    np.testing.assert_array_equal(store.get('resnet50/fp32', 'a' * 32),
+                                  np.ones(4, dtype=np.float16))
+
+
+def test_put_many_stores_every_item(store):
+    items = [(digest * 32, np.full(4, i, dtype=np.float16))
+             for i, digest in enumerate('abc')]
+    store.put_many('resnet50/fp32', items)
+
+    for digest, features in items:
+        np.testing.assert_array_equal(store.get('resnet50/fp32', digest),
+                                      features)
+
+
+def test_entries_are_kept_apart_per_model_variant(store):
+    store.put('resnet50/tflite_int8', 'a' * 32, np.ones(4, dtype=np.float16))
+
+    assert store.get('resnet50/fp32', 'a' * 32) is None
+    assert store.get('mobilenet_v2/tflite_int8', 'a' * 32) is None
+
+
+def test_purge_older_than_removes_only_expired_entries(store, monkeypatch):
+    now = 1_000_000.0
+    monkeypatch.setattr(feature_store_module.time, 'time', lambda: now - 100)
+    store.put('resnet50/fp32', 'a' * 32, np.ones(4, dtype=np.float16))
+    monkeypatch.setattr(feature_store_module.time, 'time', lambda: now)
+    store.put('resnet50/fp32', 'b' * 32, np.ones(4, dtype=np.float16))
+
+    assert store.purge_older_than(50) == 1
+    assert store.get('resnet50/fp32', 'a' * 32) is None
+    assert store.get('resnet50/fp32', 'b' * 32) is not None
+
+
+def test_purge_keeps_entries_used_since_they_were_stored(store, monkeypatch):
+    now = 1_000_000.0
+    monkeypatch.setattr(feature_store_module.time, 'time', lambda: now - 100)
+    store.put('resnet50/fp32', 'a' * 32, np.ones(4, dtype=np.float16))
+    store.put('resnet50/fp32', 'b' * 32, np.ones(4, dtype=np.float16))
+    monkeypatch.setattr(feature_store_module.time, 'time', lambda: now)
+    assert store.get('resnet50/fp32', 'a' * 32) is not None
+
+    # Recorded uses are flushed by the purge itself
+    assert store.purge_older_than(50) == 1
+    assert store.get('resnet50/fp32', 'a' * 32) is not None
+    assert store.get('resnet50/fp32', 'b' * 32) is None
+
+
+def test_opens_store_created_without_last_used(tmp_path):
+    db_path = str(tmp_path / 'features.sqlite3')
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute(
+            'CREATE TABLE features (model TEXT NOT NULL, digest TEXT NOT NULL,'
+            ' dtype TEXT NOT NULL, vector BLOB NOT NULL,'
+            ' created_at REAL NOT NULL, PRIMARY KEY (model, digest))'
+        )
+        conn.execute(
+            'INSERT INTO features VALUES (?, ?, ?, ?, ?)',
+            ('resnet50/fp32', 'a' * 32, 'float16',
+             np.ones(4, dtype=np.float16).tobytes(), 1.0)
+        )
+    conn.close()
+
+    store = FeatureStore(db_path)
+    # Migrated entries count as last used when they were stored (t=1.0)
+    assert store.purge_older_than(time.time() - 0.5) == 0
+    assert store.purge_older_than(time.time() - 2) == 1
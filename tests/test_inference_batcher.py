@@ -0,0 +1,66 @@
+"""Tests for coalescing concurrent forward passes in InferenceBatcher."""
+
+import threading
+
+import numpy as np
+import pytest
+
+from similarity_engine import InferenceBatcher
+
+
+def _images(count):
+    """Return distinct tiny uint8 images whose first pixel is their index."""
+    return [np.full((2, 2, 3), i, dtype=np.uint8) for i in range(count)]
+
+
+def test_futures_resolve_in_submission_order():
+    batch_sizes = []
+    release = threading.Event()
+
+    def predict(batch):
+        # Hold the first batch so the remaining submissions queue up together
+        release.wait(timeout=5)
+        batch_sizes.append(len(batch))
+        return batch.reshape(len(batch), -1)[:, :1].astype(np.float32)
+
+    batcher = InferenceBatcher(predict, max_batch=4, max_wait=0.05)
+    futures = [batcher.submit(img) for img in _images(10)]
+    release.set()
+
+    results = [future.result(timeout=5) for future in futures]
+    assert [int(result[0]) for result in results] == list(range(10))
+    assert sum(batch_sizes) == 10
+    assert max(batch_sizes) <= 4
+
+
+def test_error_reaches_every_future_in_batch():
+    release = threading.Event()
+
+    def predict(batch):
+        # Hold the batch until all three images have been submitted
+        release.wait(timeout=5)
+        raise RuntimeError('forward pass failed')
+
+    batcher = InferenceBatcher(predict, max_batch=8, max_wait=0.05)
+    futures = [batcher.submit(img) for img in _images(3)]
+    release.set()
+
+    for future in futures:
+        with pytest.raises(RuntimeError, match='forward pass failed'):
+            future.result(timeout=5)
+
+
+def test_worker_survives_failed_batch():
+    calls = []
+
+    def predict(batch):
+        calls.append(len(batch))
+        if len(calls) == 1:
+            raise RuntimeError('forward pass failed')
+        return np.zeros((len(batch), 1), dtype=np.float32)
+
+    batcher = InferenceBatcher(predict, max_batch=8, max_wait=0.001)
+    with pytest.raises(RuntimeError):
+        batcher.submit(_images(1)[0]).result(timeout=5)
+
+    assert batcher.submit(_images(1)[0]).result(timeout=5).shape == (1,)
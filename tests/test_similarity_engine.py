@@ -0,0 +1,156 @@
+"""Tests for ImageSimilarityEngine logic that does not need TensorFlow."""
+
+import cv2
+import numpy as np
+import pytest
+
+from similarity_engine import ImageSimilarityEngine
+
+
+def _first_pixel_features(batch):
+    """Stand-in model: the feature vector is the first pixel's colour."""
+    return batch[:, 0, 0, :].astype(np.float32)
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    # A model server URL keeps TensorFlow out; the server call is stubbed
+    engine = ImageSimilarityEngine(
+        model_server_url='http://model-server.invalid:8501',
+        coalesce_requests=False
+    )
+    monkeypatch.setattr(engine, '_run_remote_model', _first_pixel_features)
+    return engine
+
+
+@pytest.fixture
+def write_image(tmp_path):
+    def write(name, bgr):
+        path = str(tmp_path / name)
+        cv2.imwrite(path, np.full((8, 8, 3), bgr, dtype=np.uint8))
+        return path
+    return write
+
+
+@pytest.fixture
+def images(write_image):
+    """A reference and comparison images with known cosine similarities."""
+    reference = write_image('reference.png', (0, 0, 200))
+    comparisons = {
+        write_image('same.png', (0, 0, 200)): 100.0,
+        write_image('close.png', (0, 100, 200)): 89.44,
+        write_image('half.png', (0, 100, 100)): 70.71,
+        write_image('far.png', (0, 200, 0)): 0.0,
+    }
+    return reference, comparisons
+
+
+def _expected_order(comparisons):
+    return sorted(comparisons, key=comparisons.get, reverse=True)
+
+
+def test_batch_compare_returns_all_results_most_similar_first(engine, images):
+    reference, comparisons = images
+
+    results = engine.batch_compare(reference, list(comparisons))
+
+    assert [r['image'] for r in results] == _expected_order(comparisons)
+    for result in results:
+        # Features are stored as float16
+        assert result['similarity'] == pytest.approx(
+            comparisons[result['image']], abs=0.1
+        )
+
+
+def test_batch_compare_top_k_selects_most_similar(engine, images):
+    reference, comparisons = images
+
+    results = engine.batch_compare(reference, list(comparisons), top_k=2)
+
+    assert [r['image'] for r in results] == _expected_order(comparisons)[:2]
+
+
+@pytest.mark.parametrize('top_k', [4, 10])
+def test_batch_compare_top_k_at_least_n_returns_all(engine, images, top_k):
+    reference, comparisons = images
+
+    results = engine.batch_compare(reference, list(comparisons), top_k=top_k)
+
+    assert [r['image'] for r in results] == _expected_order(comparisons)
+
+
+def test_batch_compare_lists_failed_images_after_top_k(
+        engine, images, tmp_path):
+    reference, comparisons = images
+    broken = tmp_path / 'broken.png'
+    broken.write_bytes(b'not an image')
+
+    results = engine.batch_compare(
+        reference, [str(broken), *comparisons], top_k=1
+    )
+
+    assert [r['image'] for r in results] == [
+        _expected_order(comparisons)[0], str(broken)
+    ]
+    assert 'error' in results[-1]
+
+
+@pytest.mark.parametrize('top_k', [0, -2])
+def test_batch_compare_rejects_top_k_below_one(engine, images, top_k):
+    reference, comparisons = images
+
+    with pytest.raises(ValueError, match='top_k'):
+        engine.batch_compare(reference, list(comparisons), top_k=top_k)
+
+
+@pytest.fixture
+def local_engine(engine, monkeypatch):
+    """Engine running a local forward pass, and the bucket sizes it sees."""
+    bucket_sizes = []
+
+    def run_bucket(batch):
+        bucket_sizes.append(len(batch))
+        return _first_pixel_features(batch)
+
+    monkeypatch.setattr(engine, 'model_server_url', None)
+    monkeypatch.setattr(engine, '_run_bucket', run_bucket)
+    return engine, bucket_sizes
+
+
+@pytest.mark.parametrize('count, expected_buckets', [
+    (1, [1]),
+    (3, [4]),
+    (33, [32, 1]),
+    (70, [32, 32, 8]),
+])
+def test_run_model_pads_to_buckets_and_drops_padding(
+        local_engine, count, expected_buckets):
+    engine, bucket_sizes = local_engine
+    # Pixel values start at 1 so outputs for zero padding stand out
+    batch = np.stack([
+        np.full((2, 2, 3), i + 1, dtype=np.uint8) for i in range(count)
+    ])
+
+    outputs = engine._run_model(batch)
+
+    assert bucket_sizes == expected_buckets
+    assert outputs.shape == (count, 3)
+    np.testing.assert_array_equal(outputs[:, 0], np.arange(1, count + 1))
+
+
+def test_max_batch_outside_buckets_becomes_largest_bucket():
+    engine = ImageSimilarityEngine(
+        model_server_url='http://model-server.invalid:8501',
+        coalesce_requests=False, max_batch=12
+    )
+
+    assert engine._batch_buckets == (1, 2, 4, 8, 12)
+
+
+def test_warm_up_batch_sizes_round_up_to_buckets():
+    engine = ImageSimilarityEngine(
+        model_server_url='http://model-server.invalid:8501',
+        coalesce_requests=False, warm_up_batch_sizes=[1, 3, 4, 40]
+    )
+
+    assert engine._warm_up_buckets == (1, 4, 32)